@@ -1,7 +1,7 @@
 import argparse
 import asyncio
-import glob
 import logging
+import mmap
 import os
 import shutil
 import subprocess
@@ -10,16 +10,18 @@ import traceback
 import zipfile
 from datetime import UTC, datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Set
 
 import aiohttp
 from tqdm.asyncio import tqdm
 
 from models import Error, Firmware, Ok, Response, Result
 from scrape_key import decrypt_dmg
-from utils import (bundles_glob, calculate_hash, compare_either_hash,
-                   copy_previous_metadata, delete_non_bundles,
-                   process_files_with_git, put_metadata, system_has_parent)
+from utils import (HashingWriter, MappedFile, bundles_glob,
+                   compare_either_hash, copy_previous_metadata,
+                   delete_non_bundles, metadata_versions,
+                   process_files_with_git, put_metadata, scratch_dir,
+                   system_has_parent)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +30,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 1 MiB, big enough that the per-chunk python overhead (write, tqdm update) is negligible
+CHUNK_SIZE = 1 << 20
+
+# redraw the progress bars at most twice a second
+PROGRESS_BAR_OPTIONS: Dict[str, float] = {
+    "mininterval": 0.5,
+    "maxinterval": 2.0,
+    "smoothing": 0,
+}
+
 PRODUCT_CODES: Dict[str, List[str]] = {
     "iPad": [
         "16,6",
@@ -107,7 +119,6 @@ PRODUCT_CODES: Dict[str, List[str]] = {
         "10,6",
         "10,5",
         "10,4",
-        "10,4",
         "10,2",
         "10,1",
         "9,4",
@@ -135,7 +146,10 @@ PRODUCT_CODES: Dict[str, List[str]] = {
 
 
 async def download_file(
-    firmware: Firmware, version_folder: Path, session: aiohttp.ClientSession
+    firmware: Firmware,
+    version_folder: Path,
+    session: aiohttp.ClientSession,
+    quiet: bool,
 ) -> Result[Path, str]:
     """
     Downloads the firmware and returns the path to the downloaded .ipsw file
@@ -143,7 +157,14 @@ async def download_file(
     file_path = version_folder / f"{firmware.identifier}-{firmware.version}.ipsw"
 
     if file_path.exists():
-        if await compare_either_hash(file_path, firmware):
+        # a matching size is enough to tell a finished download from a partial one,
+        # only hash the whole file when ipsw.me didn't give us a size
+        if firmware.filesize:
+            is_complete = file_path.stat().st_size == firmware.filesize
+        else:
+            is_complete = await compare_either_hash(file_path, firmware)
+
+        if is_complete:
             logger.info("ipsw file already exists, using it")
             return Ok(file_path)
 
@@ -151,9 +172,7 @@ async def download_file(
         file_path.unlink()
 
     try:
-        async with session.get(
-            firmware.url, timeout=aiohttp.ClientTimeout(1000)
-        ) as response:
+        async with session.get(firmware.url) as response:
             if response.status != 200:
                 return Error(
                     f"Failed to download {firmware.identifier}: {response.status} {response.reason}"
@@ -164,10 +183,15 @@ async def download_file(
             with (
                 open(file_path, "wb") as file,
                 tqdm(
-                    total=total_size, unit="B", unit_scale=True, desc=str(file_path)
+                    total=total_size,
+                    unit="B",
+                    unit_scale=True,
+                    desc=str(file_path),
+                    disable=quiet,
+                    **PROGRESS_BAR_OPTIONS,
                 ) as progress,
             ):
-                async for chunk in response.content.iter_chunked(8192):
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
                     file.write(chunk)
                     progress.update(len(chunk))
 
@@ -208,49 +232,54 @@ async def decrypt_dmg_aea(
         subprocess.run(["sudo", "dpkg", "-i", str(deb_path)], check=True)
         deb_path.unlink(missing_ok=True)
 
-    try:
-        subprocess.run(
-            ["ipsw", "extract", "--fcs-key", str(ipsw_file), "--output", str(output)],
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True,
-        )
-    except subprocess.CalledProcessError as e:
-        return Error(f"Extraction failed: {e.stderr}")
+    process = await asyncio.create_subprocess_exec(
+        "ipsw",
+        "extract",
+        "--fcs-key",
+        str(ipsw_file),
+        "--output",
+        str(output),
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
 
-    pem_files = [Path(p) for p in glob.glob(f"{output}/**/*.pem")]
+    if process.returncode != 0:
+        return Error(f"Extraction failed: {stderr.decode(errors='ignore')}")
 
-    matching_pem = next((pem for pem in pem_files if pem.stem == dmg_file.name), None)
+    # `ipsw` puts the keys one folder deep, stop at the first match instead of
+    # listing every one of them
+    matching_pem = next(
+        (pem for pem in output.glob("*/*.pem") if pem.stem == dmg_file.name), None
+    )
 
     if matching_pem:
         logger.info(f"Found a matching PEM file: {matching_pem}")
         pem_file = matching_pem
     else:
-        if pem_files:
+        first_pem = next(output.glob("*/*.pem"), None)
+
+        if first_pem:
             logger.warning("No matched PEM, using the first one")
-            pem_file = pem_files[0]
+            pem_file = first_pem
         else:
             return Error("No PEM file found.")
 
-    try:
-        logger.info("Decrypting")
-        subprocess.run(
-            [
-                "ipsw",
-                "fw",
-                "aea",
-                "--pem",
-                str(pem_file),
-                str(dmg_file),
-                "--output",
-                str(output),
-            ],
-            text=True,
-            stderr=subprocess.PIPE,
-            check=True,
-        )
-    except subprocess.CalledProcessError as e:
-        return Error(f"Decryption failed: {e.stderr}")
+    logger.info("Decrypting")
+    process = await asyncio.create_subprocess_exec(
+        "ipsw",
+        "fw",
+        "aea",
+        "--pem",
+        str(pem_file),
+        str(dmg_file),
+        "--output",
+        str(output),
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+
+    if process.returncode != 0:
+        return Error(f"Decryption failed: {stderr.decode(errors='ignore')}")
 
     # we don't need the .dmg.aea
     dmg_file.unlink(missing_ok=True)
@@ -261,21 +290,61 @@ async def decrypt_dmg_aea(
     return Ok(None)
 
 
+async def extract_bundles_with_7z(
+    dmg_file: Path, output: Path, has_parent: bool
+) -> Result[None, str]:
+    """
+    extracts only the carrier bundles out of the dmg, the error is 7z's stderr
+    """
+    logger.info(f"Extracting bundles from {dmg_file} using 7z")
+
+    command = [
+        "7z",
+        "x",
+        dmg_file,
+        f"-o{output}",
+        "-aos",  # overwrite
+        "-bd",  # no progress
+        "-y",
+        # if true, that means there is a parent folder for the `System` folder, so glob that
+        f"{'*/' if has_parent else ''}System/Library/Carrier Bundles/*",  # where all the bundles are
+    ]
+
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+
+    logger.debug(f"7z stdout: {stdout}")
+    logger.debug(f"7z stderr: {stderr}")
+
+    if process.returncode != 0:
+        return Error(stderr.decode(errors="ignore"))
+
+    return Ok(None)
+
+
 async def extract_the_biggest_dmg(
     dmg_file: Path,
     output: Path,
+    workdir: Path,
     firmware: Firmware,
     ignored_firmwares_file: Path,
-    *,
-    skip_extraction: bool = False,
+    quiet: bool,
 ) -> Result[bool, str]:
     """
-    it would return a bool whether it the `System` has a parent or not
+    it would return a bool whether it the `System` has a parent or not,
+    the dmg and everything extracted from it end up in `workdir`
     """
 
+    biggest_dmg_file_path: Path | None = None
+
     def cleanup():
-        logger.info(f"Cleaning up extracted file: {biggest_dmg_file_path}")
-        biggest_dmg_file_path.unlink(missing_ok=True)
+        if biggest_dmg_file_path is not None:
+            logger.info(f"Cleaning up extracted file: {biggest_dmg_file_path}")
+            biggest_dmg_file_path.unlink(missing_ok=True)
 
         logger.info(f"Cleaning up original IPSW file: {dmg_file}")
         dmg_file.unlink(missing_ok=True)
@@ -289,56 +358,73 @@ async def extract_the_biggest_dmg(
             lambda ign: (ign or []) + [firmware.version],
         )
 
-    logger.info(f"Extracting the biggest DMG from {dmg_file}")
+    def copy_biggest_dmg() -> Result[Path, str]:
+        """
+        copies the biggest file of the .ipsw into `workdir`, the error is for
+        when it isn't a .dmg
+        """
+        # map the whole .ipsw so the central directory scan and the member copy
+        # read straight from the page cache instead of going through a file buffer
+        with (
+            open(dmg_file, "rb") as ipsw,
+            MappedFile(ipsw.fileno(), 0, access=mmap.ACCESS_READ) as mapped_ipsw,
+            zipfile.ZipFile(mapped_ipsw) as zip_file,
+        ):
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped_ipsw.madvise(mmap.MADV_SEQUENTIAL)
 
-    try:
-        with zipfile.ZipFile(dmg_file) as zip_file:
             biggest_dmg = max(zip_file.infolist(), key=lambda x: x.file_size)
 
             # not sure if there's one, idk, but if the biggest file is neithr a .dmg or .dmg.aea then ignore it
             if not biggest_dmg.filename.endswith((".dmg", ".dmg.aea")):
-                error_msg = "There was no .dmg in the .ipsw file, ignoring"
-                logger.warning(error_msg)
-
-                await ignore()
-                return Error(error_msg)
+                return Error("There was no .dmg in the .ipsw file, ignoring")
 
-            biggest_dmg_file_path = output / biggest_dmg.filename
+            dmg_path = workdir / biggest_dmg.filename
 
             logger.debug(
                 f"Biggest DMG found: {biggest_dmg.filename} ({biggest_dmg.file_size} bytes)"
             )
 
-            if (
-                not biggest_dmg_file_path.exists()
-                or biggest_dmg_file_path.stat().st_size != biggest_dmg.file_size
-            ) and not skip_extraction:
-                logger.info(f"Extracting {biggest_dmg.filename} to {output}")
-                with (
-                    zip_file.open(biggest_dmg) as source,
-                    open(biggest_dmg_file_path, "wb") as target,
-                    tqdm(
-                        total=biggest_dmg.file_size,
-                        unit="B",
-                        unit_scale=True,
-                        desc=f"Extracting {biggest_dmg.filename}",
-                    ) as progress,
-                ):
-                    while True:
-                        chunk = source.read(8192)
-                        if not chunk:
-                            break
-
-                        target.write(chunk)
-                        progress.update(len(chunk))
-
-            else:
-                logger.info("Skipping dmg extraction (file already exists)")
+            logger.info(f"Extracting {biggest_dmg.filename} to {workdir}")
+
+            # zip member names can have folders in them
+            dmg_path.parent.mkdir(parents=True, exist_ok=True)
+
+            with (
+                zip_file.open(biggest_dmg) as source,
+                open(dmg_path, "wb") as target,
+                tqdm.wrapattr(
+                    source,
+                    "read",
+                    total=biggest_dmg.file_size,
+                    desc=f"Extracting {biggest_dmg.filename}",
+                    disable=quiet,
+                    **PROGRESS_BAR_OPTIONS,
+                ) as progress_source,
+            ):
+                shutil.copyfileobj(progress_source, target, CHUNK_SIZE)
+
+        return Ok(dmg_path)
+
+    logger.info(f"Extracting the biggest DMG from {dmg_file}")
+
+    try:
+        # copying a multi-GB dmg would block every other firmware's task, so
+        # it goes to a thread like the hashing and tarring do
+        copy_result = await asyncio.to_thread(copy_biggest_dmg)
+
+        if isinstance(copy_result, Error):
+            logger.warning(copy_result.error)
+
+            await ignore()
+            return copy_result
+
+        biggest_dmg_file_path = copy_result.value
 
         if "aea" in biggest_dmg_file_path.suffix:
             logger.info("Detected 'aea' in file suffix, starting decryption process")
             decryption_result = await decrypt_dmg_aea(
-                dmg_file, biggest_dmg_file_path, output
+                dmg_file, biggest_dmg_file_path, workdir
             )
 
             if isinstance(decryption_result, Error):
@@ -352,59 +438,47 @@ async def extract_the_biggest_dmg(
                 biggest_dmg_file_path.parent / biggest_dmg_file_path.stem
             )
 
-        logger.info(f"Extracting bundles from {biggest_dmg_file_path} using 7z")
-
         has_parent = await system_has_parent(biggest_dmg_file_path)
 
         if isinstance(has_parent, Error):
             return has_parent
 
-        command = [
-            "7z",
-            "x",
-            biggest_dmg_file_path,
-            f"-o{output}",
-            "-aos",  # overwrite
-            "-bd",  # no progress
-            "-y",
-            # if true, that means there is a parent folder for the `System` folder, so glob that
-            f"{'*/' if has_parent.value else ''}System/Library/Carrier Bundles/*",  # where all the bundles are
-        ]
-
-        decryption_result = subprocess.run(
-            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        extraction_result = await extract_bundles_with_7z(
+            biggest_dmg_file_path, workdir, has_parent.value
         )
 
-        stdout = decryption_result.stdout
-        stderr = decryption_result.stderr
+        # usually with old firmwares, we must then decrypt it using a special key
+        if isinstance(extraction_result, Error) and (
+            "Cannot open the file as [Dmg] archive" in extraction_result.error
+        ):
+            logger.error(
+                f"Couldn't extract {dmg_file}, error: {extraction_result.error}"
+            )
 
-        logger.debug(f"7z stdout: {stdout}")
-        logger.debug(f"7z stderr: {stderr}")
+            decrypt_result = await decrypt_dmg(
+                dmg_file,
+                biggest_dmg_file_path,
+                firmware.buildid,
+                firmware.identifier,
+            )
 
-        if decryption_result.returncode != 0:
-            error_msg = f"Couldn't extract {dmg_file}, error: {stderr}"
-            logger.error(error_msg)
+            if isinstance(decrypt_result, Error):
+                return Error(f"Unable to extract the dmg, error: {decrypt_result}")
 
-            # usually with old firmwares, we must then decrypt it using a special key
-            if "Cannot open the file as [Dmg] archive" in str(stderr):
-                decrypt_result = await decrypt_dmg(
-                    dmg_file,
-                    biggest_dmg_file_path,
-                    firmware.buildid,
-                    firmware.identifier,
-                )
+            # the decrypted dmg replaced the encrypted one in place, so only the
+            # layout check and the extraction have to be redone
+            has_parent = await system_has_parent(biggest_dmg_file_path)
 
-                if isinstance(decrypt_result, Error):
-                    return Error(f"Unable to extract the dmg, error: {decrypt_result}")
+            if isinstance(has_parent, Error):
+                return has_parent
 
-                # TODO: maybe we can just extract the new thing and move on and not re-run the entire function
-                return await extract_the_biggest_dmg(
-                    dmg_file,
-                    output,
-                    firmware,
-                    ignored_firmwares_file,
-                    skip_extraction=True,
-                )
+            extraction_result = await extract_bundles_with_7z(
+                biggest_dmg_file_path, workdir, has_parent.value
+            )
+
+        if isinstance(extraction_result, Error):
+            error_msg = f"Couldn't extract {dmg_file}, error: {extraction_result.error}"
+            logger.error(error_msg)
 
             return Error(error_msg)
 
@@ -416,33 +490,54 @@ async def extract_the_biggest_dmg(
 
 async def tar_and_hash_bundles(
     bundles: List[Path],
+    output: Path,
 ) -> Result[List[Dict[str, str | int]], str]:
-    output_bundles: List[Dict[str, str | int]] = []
-
-    for bundle in bundles:
-        bundle_tar = bundle.with_suffix(".tar")
-
-        with tarfile.open(bundle_tar, "w", format=tarfile.PAX_FORMAT) as tar:
-            tar.add(bundle, arcname=bundle.name, recursive=True)
-
-        sha1 = await calculate_hash(bundle_tar, "sha1")
-        output_bundles.append(
-            {
-                "bundle_name": bundle_tar.stem,
-                "tar_file": bundle_tar.name,
-                "sha1": sha1,
-                "file_size": bundle_tar.stat().st_size,
-                "created_at": datetime.now(UTC).isoformat(),
-            }
-        )
+    def make_tar(bundle: Path, bundle_tar: Path) -> str:
+        """
+        writes the tar and returns its sha1, hashed on the way to the disk
+        """
+        with open(bundle_tar, "wb") as file:
+            writer = HashingWriter(file, "sha1")
+
+            # stream mode ("w|") only ever calls `write`, in `CHUNK_SIZE` blocks
+            with tarfile.open(
+                fileobj=writer,
+                mode="w|",
+                format=tarfile.PAX_FORMAT,
+                bufsize=CHUNK_SIZE,
+            ) as tar:
+                tar.add(bundle, arcname=bundle.name, recursive=True)
+
+        return writer.hexdigest()
+
+    async def tar_and_hash(bundle: Path) -> Dict[str, str | int]:
+        bundle_tar = output / bundle.with_suffix(".tar").name
+
+        # bundles don't depend on each other, so tar them in threads side by side
+        sha1 = await asyncio.to_thread(make_tar, bundle, bundle_tar)
 
-    return Ok(output_bundles)
+        return {
+            "bundle_name": bundle_tar.stem,
+            "tar_file": bundle_tar.name,
+            "sha1": sha1,
+            "file_size": bundle_tar.stat().st_size,
+            "created_at": datetime.now(UTC).isoformat(),
+        }
+
+    output_bundles = await asyncio.gather(*map(tar_and_hash, bundles))
+
+    return Ok(list(output_bundles))
 
 
 async def bake_ipcc(
     response: Response,
     session: aiohttp.ClientSession,
     semaphore: asyncio.Semaphore,
+    base_metadata_path: Path,
+    ignored_firmwares_metadata_path: Path,
+    processed_versions: Set[str],
+    ignored_versions: Set[str],
+    quiet: bool,
 ) -> int:
     """
     it will return the amount of firmwares that are processed
@@ -459,67 +554,64 @@ async def bake_ipcc(
                     try:
                         start_time = datetime.now(UTC)
 
-                        base_path = Path(firmware.identifier)
-                        base_path.mkdir(exist_ok=True)
-
-                        version_path = base_path / firmware.version
-                        version_path.mkdir(exist_ok=True)
-
-                        base_metadata_path = base_path / "metadata.json"
-                        base_metadata_path.touch(exist_ok=True)
-
-                        ignored_firmwares_metadata_path = (
-                            base_path / "ignored_firmwares.json"
-                        )
-                        ignored_firmwares_metadata_path.touch(exist_ok=True)
+                        version_path = base_metadata_path.parent / firmware.version
+                        # the one place the firmware's folder is created, it holds the
+                        # downloaded ipsw and the bundle tars (the dmg and the 7z output
+                        # go to the scratch dir below)
+                        version_path.mkdir(parents=True, exist_ok=True)
 
                         bundles_metadata_path = version_path / "bundles.json"
                         bundles_metadata_path.touch(exist_ok=True)
 
-                        if (
-                            firmware.version
-                            in ignored_firmwares_metadata_path.read_text()
-                        ):
-                            return
-
-                        if firmware.version in base_metadata_path.read_text():
-                            return
-
-                        ipsw_file = await download_file(firmware, version_path, session)
+                        ipsw_file = await download_file(
+                            firmware, version_path, session, quiet
+                        )
 
                         if isinstance(ipsw_file, Error):
                             raise RuntimeError(ipsw_file)
 
-                        extract_big_result = await extract_the_biggest_dmg(
-                            ipsw_file.value,
-                            version_path,
-                            firmware,
-                            ignored_firmwares_metadata_path,
+                        # the dmg and the tree 7z pulls out of it are thrown away once
+                        # the bundles are tarred, so keep them in memory when there's
+                        # room (an .aea dmg is briefly there twice, hence the 2x), the
+                        # downloaded ipsw tells the size when ipsw.me didn't
+                        ipsw_size = (
+                            firmware.filesize or ipsw_file.value.stat().st_size
                         )
 
-                        if isinstance(extract_big_result, Error):
-                            raise RuntimeError(extract_big_result)
+                        with scratch_dir(2 * ipsw_size, version_path) as workdir:
+                            extract_big_result = await extract_the_biggest_dmg(
+                                ipsw_file.value,
+                                version_path,
+                                workdir,
+                                firmware,
+                                ignored_firmwares_metadata_path,
+                                quiet,
+                            )
 
-                        has_parent = extract_big_result.value
+                            if isinstance(extract_big_result, Error):
+                                raise RuntimeError(extract_big_result)
 
-                        bundles_folders = list(
-                            await bundles_glob(version_path, has_parent)
-                        )
+                            has_parent = extract_big_result.value
 
-                        new_bundles_folders = await delete_non_bundles(
-                            version_path, bundles_folders, has_parent
-                        )
+                            bundles_folders = list(
+                                await bundles_glob(workdir, has_parent)
+                            )
 
-                        if isinstance(new_bundles_folders, Error):
-                            raise RuntimeError(new_bundles_folders)
+                            new_bundles_folders = await delete_non_bundles(
+                                workdir, bundles_folders, has_parent
+                            )
 
-                        tarred_with_hash_bundles = await tar_and_hash_bundles(
-                            new_bundles_folders.value
-                        )
+                            if isinstance(new_bundles_folders, Error):
+                                raise RuntimeError(new_bundles_folders)
 
-                        # we don't need the .bundle folder after tarring it (compress it to a .tar)
-                        for path in new_bundles_folders.value:
-                            shutil.rmtree(path)
+                            # only the tars go to the persistent disk
+                            tarred_with_hash_bundles = await tar_and_hash_bundles(
+                                new_bundles_folders.value, version_path
+                            )
+
+                            # we don't need the .bundle folder after tarring it (compress it to a .tar)
+                            for path in new_bundles_folders.value:
+                                shutil.rmtree(path)
 
                         if isinstance(tarred_with_hash_bundles, Error):
                             raise RuntimeError(tarred_with_hash_bundles)
@@ -555,41 +647,94 @@ async def bake_ipcc(
                             f"Something went wrong, {e}\n traceback: {traceback.format_exc()}"
                         )
 
+            # skip before creating anything on disk for it
+            if (
+                firmware.version in ignored_versions
+                or firmware.version in processed_versions
+            ):
+                continue
+
             group.create_task(run(firmware))
 
     return processed_count
 
 
-async def fetch_and_bake(
-    session: aiohttp.ClientSession,
-    code: str,
-    product: str,
-    semaphore: asyncio.Semaphore,
-    git_mode: bool,
-):
+async def fetch_firmwares(
+    session: aiohttp.ClientSession, code: str, product: str
+) -> Response | None:
+    """
+    fetches the device from ipsw.me, with only the firmware that would be baked
+    """
     model = f"{product}{code}"
-    response = await session.get(
-        f"https://api.ipsw.me/v4/device/{model}", params={"type": "ipsw"}
-    )
 
-    if response.status != 200:
-        logger.error(f"Failed to fetch data for {model}: {await response.text()}")
-        return
+    # one device failing must not take the whole metadata sweep down with it
+    try:
+        async with session.get(
+            f"https://api.ipsw.me/v4/device/{model}", params={"type": "ipsw"}
+        ) as response:
+            if response.status != 200:
+                logger.error(
+                    f"Failed to fetch data for {model}: {await response.text()}"
+                )
+                return None
+
+            parsed_data = Response.from_dict(await response.json())
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Failed to fetch data for {model}: {e!r}")
+        return None
+
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Unexpected data for {model}: {e!r}")
+        return None
+
+    # only the third to last firmware is baked, empty when there are fewer than 3
+    parsed_data.firmwares = parsed_data.firmwares[-3:-2]
 
-    parsed_data = Response.from_dict(await response.json())
     if not parsed_data.firmwares:
         logger.warning(f"No firmwares found for {model}")
-        return
+        return None
+
+    return parsed_data
+
 
-    del parsed_data.firmwares[-1]
-    del parsed_data.firmwares[-1]
-    del parsed_data.firmwares[:-1]
-    ident = parsed_data.firmwares[0].identifier
+async def bake_device(
+    session: aiohttp.ClientSession,
+    device: Response,
+    semaphore: asyncio.Semaphore,
+    git_mode: bool,
+    quiet: bool,
+):
+    ident = device.firmwares[0].identifier
 
     if git_mode:
         copy_previous_metadata(ident)
 
-    processed_count = await bake_ipcc(parsed_data, session, semaphore)
+    # the per identifier files are set up once here, not by every firmware task
+    base_path = Path(ident)
+    base_path.mkdir(exist_ok=True)
+
+    base_metadata_path = base_path / "metadata.json"
+    base_metadata_path.touch(exist_ok=True)
+
+    ignored_firmwares_metadata_path = base_path / "ignored_firmwares.json"
+    ignored_firmwares_metadata_path.touch(exist_ok=True)
+
+    # read once here instead of per firmware, and match whole versions (a substring
+    # check would count "1.2" as done when only "11.2" is)
+    processed_versions = metadata_versions(base_metadata_path, "fw")
+    ignored_versions = metadata_versions(ignored_firmwares_metadata_path, "ignored")
+
+    processed_count = await bake_ipcc(
+        device,
+        session,
+        semaphore,
+        base_metadata_path,
+        ignored_firmwares_metadata_path,
+        processed_versions,
+        ignored_versions,
+        quiet,
+    )
 
     if git_mode:
         if processed_count > 0:
@@ -598,6 +743,14 @@ async def fetch_and_bake(
             shutil.rmtree(ident)
 
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+
+    return number
+
+
 async def main():
     app = argparse.ArgumentParser("OpeniTools-IPCC")
 
@@ -610,17 +763,71 @@ async def main():
         action="store_true",
     )
 
-    git_mode: bool = app.parse_args().git
+    app.add_argument(
+        "--jobs",
+        "-j",
+        help="How many firmwares to download and extract at the same time",
+        required=False,
+        default=5,
+        type=positive_int,
+    )
+
+    app.add_argument(
+        "--quiet",
+        "-q",
+        help="Don't show the download/extraction progress bars (e.g. in CI)",
+        required=False,
+        default=False,
+        action="store_true",
+    )
+
+    args = app.parse_args()
+    git_mode: bool = args.git
 
     # go back before 'src'
     os.chdir(__file__.removesuffix(f"/src/{__file__.split('/')[-1]}"))
 
-    semaphore = asyncio.Semaphore(5)
+    # shared by every product's `bake_ipcc`, so it's the one global cap on heavy work
+    semaphore = asyncio.Semaphore(args.jobs)
 
-    async with aiohttp.ClientSession() as session:
-        for product, codes in PRODUCT_CODES.items():
-            for code in codes:
-                await fetch_and_bake(session, code, product, semaphore, git_mode)
+    # few hosts (api.ipsw.me and apple's cdn) get hit over and over, so keep their
+    # connections and dns answers around instead of reconnecting for every firmware
+    connector = aiohttp.TCPConnector(
+        limit=max(32, args.jobs),
+        limit_per_host=max(8, args.jobs),
+        ttl_dns_cache=600,
+        keepalive_timeout=75,
+    )
+
+    # no total timeout, downloading a multi-GB ipsw can take as long as it takes,
+    # it only fails when the connection stalls
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # fetch every device's metadata up front, the heavy work starts after
+        responses = await asyncio.gather(
+            *(
+                fetch_firmwares(session, code, product)
+                for product, codes in PRODUCT_CODES.items()
+                for code in codes
+            )
+        )
+        devices = [device for device in responses if device is not None]
+
+        # the git flow stashes and switches branches on the whole working tree,
+        # so it can't run while other devices are still writing into it
+        if git_mode:
+            for device in devices:
+                await bake_device(session, device, semaphore, git_mode, args.quiet)
+
+            return
+
+        # the semaphore inside `bake_ipcc` caps the heavy work across all devices
+        async with asyncio.TaskGroup() as group:
+            for device in devices:
+                group.create_task(
+                    bake_device(session, device, semaphore, git_mode, args.quiet)
+                )
 
 
 if __name__ == "__main__":
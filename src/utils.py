@@ -2,11 +2,16 @@ import asyncio
 import glob
 import hashlib
 import json
+import mmap
+import os
 import shutil
 import subprocess
+import tempfile
+from contextlib import contextmanager
 from datetime import UTC, datetime
 from pathlib import Path
-from typing import Callable, List, Literal, Optional, TypeVar
+from typing import (BinaryIO, Callable, Iterator, List, Literal, Optional,
+                    Set, TypeVar)
 
 from models import Error, Firmware, Ok, Result
 
@@ -14,6 +19,34 @@ from models import Error, Firmware, Ok, Result
 J = TypeVar("J")
 
 
+class MappedFile(mmap.mmap):
+    """
+    a read-only mmap that can be handed to `zipfile.ZipFile`, which wants `seekable()`
+    (mmap only got it in python 3.13)
+    """
+
+    def seekable(self) -> bool:
+        return True
+
+
+class HashingWriter:
+    """
+    a write-only file wrapper that feeds everything written through it to a hash,
+    so a file can be hashed while it's being produced instead of re-reading it after
+    """
+
+    def __init__(self, file: BinaryIO, algo: Literal["sha1", "md5"]):
+        self.file = file
+        self.hash_func = getattr(hashlib, algo)()
+
+    def write(self, data: bytes) -> int:
+        self.hash_func.update(data)
+        return self.file.write(data)
+
+    def hexdigest(self) -> str:
+        return self.hash_func.hexdigest()
+
+
 def process_files_with_git(ident: str):
     subprocess.run(["git", "add", "."], check=True)
     subprocess.run(["git", "stash", "push"], check=True)
@@ -78,12 +111,27 @@ def copy_previous_metadata(ident: str) -> None:
 
 
 async def calculate_hash(file_path: Path, algo: Literal["sha1", "md5"]) -> str:
-    hash_func = getattr(hashlib, algo)()
-    with file_path.open("rb") as file:
-        for chunk in iter(lambda: file.read(4096), b""):
-            hash_func.update(chunk)
+    def hash_file() -> str:
+        hash_func = getattr(hashlib, algo)()
+
+        # can't mmap an empty file
+        if file_path.stat().st_size == 0:
+            return hash_func.hexdigest()
+
+        # hash the mapped file in one go, no copying it through a read buffer
+        with (
+            file_path.open("rb") as file,
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file,
+        ):
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped_file.madvise(mmap.MADV_SEQUENTIAL)
+
+            hash_func.update(mapped_file)
 
-    return hash_func.hexdigest()
+        return hash_func.hexdigest()
+
+    # hashlib releases the GIL on big buffers, so this doesn't stall the event loop
+    return await asyncio.to_thread(hash_file)
 
 async def compare_either_hash(file_path: Path, firmware: Firmware) -> bool:
     sha1 = await calculate_hash(file_path, "sha1")
@@ -113,6 +161,62 @@ async def put_metadata(
     return Ok(None)
 
 
+# bytes promised to scratch dirs on /dev/shm that may not be written yet, so
+# concurrent firmwares don't all count the same free space as theirs
+_tmpfs_reserved_bytes = 0
+
+
+def _tmpfs_fits(shm: Path, needed_bytes: int) -> bool:
+    try:
+        free_ram = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError):
+        return False
+
+    free = min(shutil.disk_usage(shm).free, free_ram) - _tmpfs_reserved_bytes
+    return free > needed_bytes
+
+
+@contextmanager
+def scratch_dir(needed_bytes: int, fallback: Path) -> Iterator[Path]:
+    """
+    a temporary directory on `/dev/shm` when it's there and it, the free RAM and
+    the other scratch dirs' reservations leave room for `needed_bytes`,
+    otherwise inside `fallback`
+    """
+    global _tmpfs_reserved_bytes
+
+    shm = Path("/dev/shm")
+
+    # no await between the check and the reservation, so the event loop can't
+    # let another firmware claim the same space in between
+    use_tmpfs = shm.is_dir() and _tmpfs_fits(shm, needed_bytes)
+    if use_tmpfs:
+        _tmpfs_reserved_bytes += needed_bytes
+
+    try:
+        with tempfile.TemporaryDirectory(
+            dir=shm if use_tmpfs else fallback, ignore_cleanup_errors=True
+        ) as name:
+            yield Path(name)
+    finally:
+        if use_tmpfs:
+            _tmpfs_reserved_bytes -= needed_bytes
+
+
+def metadata_versions(metadata_path: Path, key: str) -> Set[str]:
+    """Collect the firmware versions listed under `key` in a JSON metadata file."""
+    try:
+        metadata = json.loads(metadata_path.read_text() or "{}")
+    except (FileNotFoundError, json.JSONDecodeError):
+        return set()
+
+    # entries are either plain versions or `{"version": ...}` records
+    return {
+        entry["version"] if isinstance(entry, dict) else entry
+        for entry in metadata.get(key) or []
+    }
+
+
 async def bundles_glob(path: Path, has_parent: bool = False) -> List[Path]:
     return list(
         map(